@@ -6,19 +6,39 @@ Usage:
     python deploy.py              # Configure and verify
     python deploy.py --start      # Configure, verify, and start listener
     python deploy.py --check      # Just check prerequisites
+    python deploy.py --help       # Show this help
 """
 
 import os
 import sys
 import json
-import subprocess
+import contextlib
+import functools
+import hashlib
+import mmap
+import pickle
+import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import SimpleNamespace
 
 SCRIPT_DIR = Path(__file__).parent
 CONFIG_FILE = SCRIPT_DIR / "config.json"
 AGENT_DIR = SCRIPT_DIR / "agent"
 CONTEXT_DIR = AGENT_DIR / "context"
+CONFIG_CACHE_FILE = SCRIPT_DIR / ".config.cache.pkl"
+TEMPLATE_STAMPS_FILE = AGENT_DIR / ".template.stamps"
+CLAUDE_PATH_CACHE_FILE = SCRIPT_DIR / ".claude_path"
+DEPLOY_STAMP_FILE = SCRIPT_DIR / ".deploy_ok"
+
+# Set DEPLOY_CONFIG_CACHE=1 to reuse the parsed config between runs
+CONFIG_CACHE_ENV = "DEPLOY_CONFIG_CACHE"
+
+HELP_FLAGS = frozenset({"--help", "-h"})
+
+# Template placeholders, matched in a single pass over each file's raw bytes
+PLACEHOLDER_PATTERN = re.compile(rb"\{\{(AGENT_NAME|DESCRIPTION)\}\}")
 
 
 def load_config():
@@ -28,109 +48,272 @@ def load_config():
         print("Create config.json with your agent settings.")
         sys.exit(1)
 
-    with open(CONFIG_FILE, 'r') as f:
-        return json.load(f)
+    if os.getenv(CONFIG_CACHE_ENV) == "1":
+        return _load_config_cached()
+
+    return json.loads(CONFIG_FILE.read_bytes())
+
 
+def _load_config_cached():
+    """Load config.json, reusing a pickled copy while the file is unchanged."""
+    st = os.stat(CONFIG_FILE)
+    key = (str(CONFIG_FILE), st.st_mtime_ns, st.st_size)
+
+    try:
+        with open(CONFIG_CACHE_FILE, 'rb') as f:
+            cached_key, cached_config = pickle.load(f)
+        if cached_key == key:
+            return cached_config
+    except Exception:
+        pass
+
+    config = json.loads(CONFIG_FILE.read_bytes())
+
+    try:
+        with open(CONFIG_CACHE_FILE, 'wb') as f:
+            pickle.dump((key, config), f, protocol=5)
+    except OSError as e:
+        print(f"  WARNING: Could not write config cache: {e}")
 
-def check_prerequisites(config):
+    return config
+
+
+def resolve_settings(config):
+    """Resolve config.json values and their defaults once for the helpers below."""
+    agent_name = config["agent_name"]
+    return SimpleNamespace(
+        agent_name=agent_name,
+        description=config.get("description", f"{agent_name} Agent"),
+        listen_port=config["listen_port"],
+        listen_host=config.get("listen_host", "0.0.0.0"),
+        crm_endpoint=config["crm_endpoint"],
+        api_key_env=config.get("api_key_env", "ACTO"),
+    )
+
+
+def check_prerequisites(settings):
     """Check all prerequisites are met."""
-    print("\n=== Checking Prerequisites ===\n")
+    # Probes are independent and import/IO bound, so run them concurrently
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(check, settings) for check in PREREQUISITE_CHECKS]
+        results = [future.result() for future in futures]
+
     all_ok = True
+    output = ["\n=== Checking Prerequisites ===\n"]
+    for ok, lines in results:
+        output.extend(lines)
+        all_ok = all_ok and ok
+
+    _write_lines(output)
+    return all_ok
+
 
-    # Python version
+def _check_python(settings):
+    """Check the Python version."""
     py_version = sys.version_info
     if py_version >= (3, 8):
-        print(f"  [OK] Python {py_version.major}.{py_version.minor}")
-    else:
-        print(f"  [FAIL] Python 3.8+ required (found {py_version.major}.{py_version.minor})")
-        all_ok = False
+        return True, [f"  [OK] Python {py_version.major}.{py_version.minor}"]
+    return False, [f"  [FAIL] Python 3.8+ required (found {py_version.major}.{py_version.minor})"]
+
 
-    # Flask
+def _check_flask(settings):
+    """Check Flask is installed."""
     try:
         import flask
-        try:
-            from importlib.metadata import version
-            flask_ver = version("flask")
-        except:
-            flask_ver = "installed"
-        print(f"  [OK] Flask {flask_ver}")
+        # Plain attribute on Flask < 3.0; newer releases only expose it through a
+        # deprecated module __getattr__, so fall back to the dist-info there
+        flask_ver = vars(flask).get("__version__")
+        if not flask_ver:
+            try:
+                from importlib.metadata import version
+                flask_ver = version("flask")
+            except:
+                flask_ver = "installed"
+        return True, [f"  [OK] Flask {flask_ver}"]
     except ImportError:
-        print("  [FAIL] Flask not installed - run: pip install flask")
-        all_ok = False
+        return False, ["  [FAIL] Flask not installed - run: pip install flask"]
 
-    # Requests
+
+def _check_requests(settings):
+    """Check Requests is installed."""
     try:
         import requests
-        print(f"  [OK] Requests {requests.__version__}")
+        return True, [f"  [OK] Requests {requests.__version__}"]
     except ImportError:
-        print("  [FAIL] Requests not installed - run: pip install requests")
-        all_ok = False
+        return False, ["  [FAIL] Requests not installed - run: pip install requests"]
+
+
+def _check_claude_cli(settings):
+    """Check the Claude CLI is on PATH."""
+    claude_path = _find_claude_cli()
+    if claude_path:
+        return True, [f"  [OK] Claude CLI found: {claude_path}"]
+    return False, [
+        "  [FAIL] Claude CLI not found in PATH",
+        "         Install: npm install -g @anthropic-ai/claude-code",
+    ]
+
+
+def _find_claude_cli():
+    """Resolve the claude executable, reusing the last result while $PATH is unchanged."""
+    path_hash = hashlib.blake2b(os.environ.get("PATH", "").encode(), digest_size=8).hexdigest()
+
+    try:
+        cached_hash, cached_path = CLAUDE_PATH_CACHE_FILE.read_text(encoding='utf-8').split("\n", 1)
+        if cached_hash == path_hash and os.access(cached_path, os.X_OK):
+            return cached_path
+    except (OSError, ValueError):
+        pass
 
-    # Claude CLI
     claude_path = shutil.which("claude")
     if claude_path:
-        print(f"  [OK] Claude CLI found: {claude_path}")
-    else:
-        print("  [FAIL] Claude CLI not found in PATH")
-        print("         Install: npm install -g @anthropic-ai/claude-code")
-        all_ok = False
+        try:
+            CLAUDE_PATH_CACHE_FILE.write_text(f"{path_hash}\n{claude_path}", encoding='utf-8')
+        except OSError:
+            pass
+    return claude_path
 
-    # API Key environment variable
-    api_key_env = config.get("api_key_env", "ACTO")
+
+def _check_api_key(settings):
+    """Check the API key environment variable is set."""
+    api_key_env = settings.api_key_env
     if os.getenv(api_key_env):
-        print(f"  [OK] {api_key_env} environment variable set")
-    else:
-        print(f"  [FAIL] {api_key_env} environment variable not set")
-        all_ok = False
+        return True, [f"  [OK] {api_key_env} environment variable set"]
+    return False, [f"  [FAIL] {api_key_env} environment variable not set"]
+
+
+def _check_agent_dir(settings):
+    """Check agent/ and CLAUDE.md exist."""
+    ok = True
+    lines = []
+    stats = _stat_paths(("agent", "agent/CLAUDE.md"))
 
-    # Directories
-    if AGENT_DIR.exists():
-        print(f"  [OK] Agent directory: {AGENT_DIR}")
+    if stats["agent"] is not None:
+        lines.append(f"  [OK] Agent directory: {AGENT_DIR}")
     else:
-        print(f"  [FAIL] Agent directory missing: {AGENT_DIR}")
-        all_ok = False
+        lines.append(f"  [FAIL] Agent directory missing: {AGENT_DIR}")
+        ok = False
 
-    if (AGENT_DIR / "CLAUDE.md").exists():
-        print(f"  [OK] CLAUDE.md found")
+    if stats["agent/CLAUDE.md"] is not None:
+        lines.append(f"  [OK] CLAUDE.md found")
     else:
-        print(f"  [FAIL] CLAUDE.md missing in agent/")
-        all_ok = False
+        lines.append(f"  [FAIL] CLAUDE.md missing in agent/")
+        ok = False
+
+    return ok, lines
+
+
+def _stat_paths(names):
+    """Stat paths relative to SCRIPT_DIR through one directory fd (None if missing)."""
+    dir_fd = None
+    if os.stat in os.supports_dir_fd and hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(str(SCRIPT_DIR), os.O_RDONLY | os.O_DIRECTORY)
+
+    results = {}
+    try:
+        for name in names:
+            try:
+                if dir_fd is None:
+                    results[name] = os.stat(SCRIPT_DIR / name)
+                else:
+                    results[name] = os.stat(name, dir_fd=dir_fd)
+            except (FileNotFoundError, NotADirectoryError):
+                results[name] = None
+    finally:
+        if dir_fd is not None:
+            os.close(dir_fd)
+
+    return results
+
+
+# Printed in this order regardless of which probe finishes first
+PREREQUISITE_CHECKS = (
+    _check_python,
+    _check_flask,
+    _check_requests,
+    _check_claude_cli,
+    _check_api_key,
+    _check_agent_dir,
+)
+
+
+def _deploy_stamp(settings):
+    """Hash everything a successful prerequisite check depends on."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (
+        CONFIG_FILE.read_bytes(),
+        sys.version.encode(),
+        (_find_claude_cli() or "").encode(),
+        os.environ.get(settings.api_key_env, "").encode(),
+    ):
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _read_deploy_stamp():
+    """Return the stamp saved by the last successful check, if any."""
+    try:
+        return DEPLOY_STAMP_FILE.read_text(encoding='utf-8').strip()
+    except OSError:
+        return None
 
-    return all_ok
 
+def _write_deploy_stamp(stamp):
+    """Record a successful prerequisite check."""
+    try:
+        DEPLOY_STAMP_FILE.write_text(stamp, encoding='utf-8')
+    except OSError as e:
+        print(f"  WARNING: Could not write {DEPLOY_STAMP_FILE.name}: {e}")
 
-def apply_templates(config):
+
+def apply_templates(settings):
     """Replace {{placeholders}} in template files."""
     print("\n=== Applying Configuration ===\n")
 
-    agent_name = config["agent_name"]
-    description = config.get("description", f"{agent_name} Agent")
+    agent_name = settings.agent_name
+    description = settings.description
 
-    replacements = {
-        "{{AGENT_NAME}}": agent_name,
-        "{{DESCRIPTION}}": description,
-    }
+    substitute = _make_substituter(agent_name, description)
 
-    # Files to process
+    # Files to process - plain string paths, the loop needs no Path features
+    agent_dir = str(AGENT_DIR)
+    context_dir = str(CONTEXT_DIR)
     template_files = [
-        AGENT_DIR / "CLAUDE.md",
-        CONTEXT_DIR / "identity.md",
-        CONTEXT_DIR / "crm-api.md",
+        os.path.join(agent_dir, "CLAUDE.md"),
+        os.path.join(context_dir, "identity.md"),
+        os.path.join(context_dir, "crm-api.md"),
     ]
 
+    present = {directory: _dir_names(directory) for directory in (agent_dir, context_dir)}
+    stamps = _load_template_stamps()
+    stamps_changed = False
+
     for filepath in template_files:
-        if filepath.exists():
-            content = filepath.read_text(encoding='utf-8')
-            original = content
+        directory, filename = os.path.split(filepath)
+        if filename in present[directory]:
+            with open(filepath, 'rb') as f, _map_readonly(f) as data:
+                stamp = _template_stamp(data, agent_name, description)
+                if stamps.get(filename) == stamp:
+                    print(f"  [OK] {filename} (no changes needed)")
+                    continue
+
+                # Deployed files have no "{{" left, so skip the regex pass for them
+                raw, count = substitute(data) if data.find(b"{{") >= 0 else (None, 0)
+
+            if count:
+                with open(filepath, 'wb') as f:
+                    f.write(raw)
+                stamp = _template_stamp(raw, agent_name, description)
+                print(f"  [UPDATED] {filename}")
+            else:
+                print(f"  [OK] {filename} (no changes needed)")
 
-            for placeholder, value in replacements.items():
-                content = content.replace(placeholder, value)
+            stamps[filename] = stamp
+            stamps_changed = True
 
-            if content != original:
-                filepath.write_text(content, encoding='utf-8')
-                print(f"  [UPDATED] {filepath.name}")
-            else:
-                print(f"  [OK] {filepath.name} (no changes needed)")
+    if stamps_changed:
+        _save_template_stamps(stamps)
 
     # Ensure threads directory exists
     threads_dir = AGENT_DIR / "threads"
@@ -138,26 +321,103 @@ def apply_templates(config):
     print(f"  [OK] threads/ directory ready")
 
 
-def show_summary(config):
+def _make_substituter(agent_name, description):
+    """Bind placeholder values once; returns raw bytes -> (new bytes, count)."""
+    # Placeholders are ASCII, so substitution works on UTF-8 bytes directly
+    lookup = {
+        b"AGENT_NAME": agent_name.encode('utf-8'),
+        b"DESCRIPTION": description.encode('utf-8'),
+    }.__getitem__
+
+    def replace_match(match):
+        return lookup(match[1])
+
+    return functools.partial(PLACEHOLDER_PATTERN.subn, replace_match)
+
+
+def _map_readonly(f):
+    """Memory-map an open file read-only (empty files cannot be mapped)."""
+    if os.fstat(f.fileno()).st_size == 0:
+        return contextlib.nullcontext(b"")
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _dir_names(directory):
+    """Return the entry names in a directory (empty if it does not exist)."""
+    try:
+        with os.scandir(directory) as it:
+            return {entry.name for entry in it}
+    except FileNotFoundError:
+        return set()
+
+
+def _template_stamp(raw, agent_name, description):
+    """Hash a template's bytes together with the values applied to it."""
+    h = hashlib.blake2b(digest_size=16)
+    for part in (raw, agent_name.encode('utf-8'), description.encode('utf-8')):
+        h.update(part)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def _load_template_stamps():
+    """Load per-file template stamps from the last deploy."""
+    try:
+        with open(TEMPLATE_STAMPS_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_template_stamps(stamps):
+    """Write template stamps atomically."""
+    tmp_path = TEMPLATE_STAMPS_FILE.with_name(TEMPLATE_STAMPS_FILE.name + ".tmp")
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(stamps, f)
+        os.replace(tmp_path, TEMPLATE_STAMPS_FILE)
+    except OSError as e:
+        print(f"  WARNING: Could not write template stamps: {e}")
+
+
+def show_summary(settings):
     """Show configuration summary."""
-    print("\n=== Agent Configuration ===\n")
-    print(f"  Agent Name:    {config['agent_name']}")
-    print(f"  Listen Port:   {config['listen_port']}")
-    print(f"  Listen Host:   {config.get('listen_host', '0.0.0.0')}")
-    print(f"  CRM Endpoint:  {config['crm_endpoint']}")
-    print(f"  API Key Env:   {config.get('api_key_env', 'ACTO')}")
-    print(f"  Working Dir:   {AGENT_DIR}")
+    _write_lines([
+        "\n=== Agent Configuration ===\n",
+        f"  Agent Name:    {settings.agent_name}",
+        f"  Listen Port:   {settings.listen_port}",
+        f"  Listen Host:   {settings.listen_host}",
+        f"  CRM Endpoint:  {settings.crm_endpoint}",
+        f"  API Key Env:   {settings.api_key_env}",
+        f"  Working Dir:   {AGENT_DIR}",
+    ])
+
+
+def _write_lines(lines):
+    """Write a section of output with a single write and flush."""
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def start_listener():
     """Start the listener service."""
     print("\n=== Starting Listener ===\n")
-    listener_path = SCRIPT_DIR / "listener.py"
-    subprocess.run([sys.executable, str(listener_path)])
+
+    # Run it in this interpreter to skip a second Python startup; flask and
+    # requests are only already imported if the prerequisite checks ran
+    if str(SCRIPT_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPT_DIR))
+    import listener
+    listener.main()
 
 
 def main():
-    args = sys.argv[1:]
+    args = frozenset(sys.argv[1:])
+
+    # Cheap paths that never need the config
+    if not args.isdisjoint(HELP_FLAGS):
+        print(__doc__.strip())
+        return
 
     print("""
 =====================================
@@ -165,19 +425,28 @@ def main():
 =====================================
 """)
 
-    config = load_config()
-    show_summary(config)
+    settings = resolve_settings(load_config())
+    show_summary(settings)
+
+    stamp = _deploy_stamp(settings)
 
     if "--check" in args:
-        ok = check_prerequisites(config)
+        ok = check_prerequisites(settings)
+        if ok:
+            _write_deploy_stamp(stamp)
         sys.exit(0 if ok else 1)
 
-    ok = check_prerequisites(config)
-    if not ok:
-        print("\n[!] Fix prerequisites before continuing.")
-        sys.exit(1)
+    if _read_deploy_stamp() == stamp:
+        print("\n=== Prerequisites unchanged since last successful check ===")
+        print(f"  (run --check or delete {DEPLOY_STAMP_FILE.name} to re-verify)")
+    else:
+        ok = check_prerequisites(settings)
+        if not ok:
+            print("\n[!] Fix prerequisites before continuing.")
+            sys.exit(1)
+        _write_deploy_stamp(stamp)
 
-    apply_templates(config)
+    apply_templates(settings)
 
     print("\n=== Ready! ===\n")
     print(f"  To start: python listener.py")
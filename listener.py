@@ -13,22 +13,42 @@ Architecture:
 """
 
 import os
+import re
 import sys
 import json
+import mmap
 import subprocess
 import threading
 import shutil
+import tempfile
+import random
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from pathlib import Path
 
 from flask import Flask, request, jsonify
+from flask.json.provider import DefaultJSONProvider
 import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    # Fast JSON for responses and history files; stdlib json when missing
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    # Production WSGI server; falls back to Flask's dev server when missing
+    from waitress import serve as waitress_serve
+except ImportError:
+    waitress_serve = None
 
 # Version - increment when making changes
-LISTENER_VERSION = "1.1.0"
+LISTENER_VERSION = "1.2.0"
 
 # Load configuration from config.json
 SCRIPT_DIR = Path(__file__).parent
@@ -44,6 +64,12 @@ with open(CONFIG_FILE, 'r') as f:
 AGENT_NAME = CONFIG.get("agent_name", "UNCONFIGURED")
 LISTEN_HOST = CONFIG.get("listen_host", "0.0.0.0")
 LISTEN_PORT = CONFIG.get("listen_port", 8080)
+SERVER_THREADS = CONFIG.get("server_threads", 16)
+HISTORY_CACHE_SIZE = CONFIG.get("history_cache_size", 256)
+# Concurrent Claude CLI sessions, and accepted-but-unfinished messages before 429
+MAX_SESSIONS = CONFIG.get("max_sessions", min(os.cpu_count() or 1, 4))
+MAX_PENDING_MESSAGES = CONFIG.get("max_pending_messages", 32)
+SKILL_SYNC_WORKERS = 8
 CRM_ENDPOINT = CONFIG.get("crm_endpoint", "https://crm.actionapi.ca")
 API_KEY_ENV = CONFIG.get("api_key_env", "ACTO")
 
@@ -56,39 +82,72 @@ if not CRM_API_KEY:
     print(f"ERROR: {API_KEY_ENV} environment variable not set")
     sys.exit(1)
 
+# Shared CRM session - keep-alive connections are pooled and reused across calls
+CRM_SESSION = requests.Session()
+CRM_SESSION.headers["X-API-Key"] = CRM_API_KEY
+CRM_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+CRM_SESSION.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
 # Paths - agent/ directory contains CLAUDE.md and context/
 WORKING_DIR = SCRIPT_DIR / "agent"
 CONTEXT_DIR = WORKING_DIR / "context"
 THREADS_DIR = WORKING_DIR / "threads"
 
+# Context/skill names: alphanumeric, dash, underscore (\Z - no trailing newline)
+NAME_RE = re.compile(r'\A[A-Za-z0-9_-]+\Z')
+
+# Matches "@context/<file>.md" imports anywhere in CLAUDE.md; stops at the next "@"
+# (greedy, so a name like "my.mdnotes.md" is not cut at its first ".md")
+CONTEXT_IMPORT_RE = re.compile(rb'@context/([^\s@]+\.md)')
+
+# Process umask, read once while still single-threaded (os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
 # Ensure directories exist
 WORKING_DIR.mkdir(exist_ok=True)
 CONTEXT_DIR.mkdir(exist_ok=True)
 THREADS_DIR.mkdir(exist_ok=True)
 
 
+# Tailscale IP once known - it doesn't change for the life of the process
+_tailscale_ip = None
+
+
 def get_tailscale_ip():
-    """Get Tailscale IPv4 address."""
+    """Get Tailscale IPv4 address, only running the tailscale CLI until it succeeds."""
+    global _tailscale_ip
+    if _tailscale_ip:
+        return _tailscale_ip
+
     try:
         result = subprocess.run(["tailscale", "ip", "-4"], capture_output=True, text=True)
-        if result.returncode == 0:
-            return result.stdout.strip()
+        if result.returncode == 0 and result.stdout.strip():
+            _tailscale_ip = result.stdout.strip()
+            return _tailscale_ip
     except:
         pass
     return None
 
 
-def register_with_crm(retries=5, delay=10):
-    """Register agent with CRM on startup. Retries if Tailscale not ready."""
+def _backoff_delay(attempt, base_delay, max_delay, jitter):
+    """Exponential backoff with random jitter, so restarting agents don't retry in lockstep."""
+    return min(base_delay * 2 ** attempt, max_delay) + random.uniform(0, jitter)
+
+
+def register_with_crm(retries=8, base_delay=1, max_delay=30, jitter=1):
+    """Register agent with CRM on startup. Retries with backoff if Tailscale not ready."""
     if not CRM_API_KEY:
         print("No API key - skipping CRM registration")
         return False
 
     for attempt in range(retries):
+        delay = _backoff_delay(attempt, base_delay, max_delay, jitter)
+
         ip = get_tailscale_ip()
         if not ip:
             if attempt < retries - 1:
-                print(f"No Tailscale IP yet, retry {attempt + 1}/{retries} in {delay}s...")
+                print(f"No Tailscale IP yet, retry {attempt + 1}/{retries} in {delay:.1f}s...")
                 time.sleep(delay)
                 continue
             else:
@@ -96,10 +155,9 @@ def register_with_crm(retries=5, delay=10):
                 return False
 
         try:
-            resp = requests.post(
+            resp = CRM_SESSION.post(
                 f"{CRM_ENDPOINT}/api/agents/register",
                 json={"name": AGENT_NAME, "ip": ip, "port": LISTEN_PORT, "default": False},
-                headers={"X-API-Key": CRM_API_KEY},
                 timeout=10
             )
             if resp.status_code == 200:
@@ -112,7 +170,7 @@ def register_with_crm(retries=5, delay=10):
             print(f"CRM registration error: {e}")
 
         if attempt < retries - 1:
-            print(f"Retrying registration in {delay}s...")
+            print(f"Retrying registration in {delay:.1f}s...")
             time.sleep(delay)
 
     return False
@@ -127,12 +185,158 @@ class ThreadState:
     message_count: int = 0
 
 
+def scan_files(directory: Path, suffix) -> list:
+    """List files (symlinks followed) in a directory ending with suffix, in one scandir pass."""
+    with os.scandir(directory) as it:
+        return [
+            entry for entry in it
+            if entry.name.endswith(suffix) and entry.is_file()
+        ]
+
+
+def file_etag(path: Path) -> str:
+    """Weak ETag from a single stat - changes whenever mtime or size does."""
+    st = os.stat(path)
+    return f'W/"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def write_bytes_atomic(path: Path, data: bytes):
+    """Write data to a uniquely named temp file beside path, then swap it in.
+
+    The new file keeps path's permission bits if it exists, else gets the
+    umask default a plain open() would give (mkstemp always creates 0600).
+    """
+    # A unique name per writer, so concurrent workers never rename each other's file
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        try:
+            shutil.copymode(path, tmp_name)
+        except FileNotFoundError:
+            os.chmod(tmp_name, 0o666 & ~_UMASK)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def dumps_line(obj) -> bytes:
+    """Serialize one history entry as a UTF-8 JSON line."""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    return (json.dumps(obj, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+def loads_line(line):
+    """Parse one history JSON line (str or bytes)."""
+    if orjson is not None:
+        return orjson.loads(line)
+    return json.loads(line)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson, with the same sorted-key output."""
+
+    option = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.option),
+            mimetype=self.mimetype
+        )
+
+
+class _ClaudeMdCache:
+    """CLAUDE.md imports, re-parsed only when the file's mtime or size changes."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._key: Optional[Tuple[int, int]] = None
+        self._imports: Tuple[str, ...] = ()
+        self._included: FrozenSet[str] = frozenset()
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+            key = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            key = None
+
+        with self._lock:
+            if key == self._key:
+                return
+            if key is None or key[1] == 0:
+                self._imports = ()
+            else:
+                # Scan the mapped bytes; only the matched names get decoded
+                try:
+                    with open(self.path, 'rb') as f, \
+                            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        self._imports = tuple(
+                            name.decode('utf-8', errors='replace')
+                            for name in CONTEXT_IMPORT_RE.findall(mm)
+                        )
+                except (OSError, ValueError) as e:
+                    # Removed or truncated to empty since the stat
+                    print(f"   WARNING: Failed to read CLAUDE.md imports: {e}")
+                    self._imports = ()
+            self._included = frozenset(self._imports)
+            self._key = key
+
+    def invalidate(self):
+        """Force a re-parse on next use, for writes a same-tick stat can't see."""
+        with self._lock:
+            self._key = None
+
+    def imports(self) -> Tuple[str, ...]:
+        """Imported context filenames, in CLAUDE.md order."""
+        self._refresh()
+        return self._imports
+
+    def included(self) -> FrozenSet[str]:
+        """Imported context filenames, for membership checks."""
+        self._refresh()
+        return self._included
+
+
+@dataclass
+class ThreadMeta:
+    """Per-thread summary for /threads, kept in step with the history files."""
+    user_count: int = 0
+    last_active: str = ""
+
+
 class AgentListener:
     """Listener service using CLI-based Claude spawning with composable context."""
 
     def __init__(self):
         self.threads: Dict[str, ThreadState] = {}
+        self.claude_md = _ClaudeMdCache(WORKING_DIR / "CLAUDE.md")
+        # Recently used thread histories (LRU), kept in step with the JSONL files
+        self._history_cache: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._history_lock = threading.Lock()
+        self._thread_meta: Dict[str, ThreadMeta] = self._build_thread_index()
+        # Daemon worker per message, gated to MAX_SESSIONS concurrent Claude runs.
+        # Daemon threads (not an executor) so stopping the listener exits at once
+        # instead of draining every queued message first.
+        self._session_slots = threading.BoundedSemaphore(MAX_SESSIONS)
+        self._pending_messages = 0
+        self._pending_lock = threading.Lock()
         self.app = Flask(__name__)
+        if orjson is not None:
+            self.app.json = OrjsonProvider(self.app)
         self._setup_routes()
 
     def _setup_routes(self):
@@ -167,9 +371,8 @@ class AgentListener:
             force = data.get('force', False)
 
             try:
-                response = requests.get(
+                response = CRM_SESSION.get(
                     f"{CRM_ENDPOINT}/api/agents/listener",
-                    headers={"X-API-Key": CRM_API_KEY},
                     params={"agent": AGENT_NAME},
                     timeout=30
                 )
@@ -194,13 +397,14 @@ class AgentListener:
                         "message": "Already at latest version"
                     })
 
-                # Backup current file
+                # Backup current file (contents only - no extra mode syscalls)
                 listener_path = Path(__file__)
                 backup_path = listener_path.with_suffix('.py.bak')
-                shutil.copy(listener_path, backup_path)
+                shutil.copyfile(listener_path, backup_path)
 
-                # Write new code
-                listener_path.write_text(new_code, encoding='utf-8')
+                # Write new code beside it, then swap in atomically so a failed
+                # write can't leave a truncated listener.py behind
+                write_bytes_atomic(listener_path, new_code.encode('utf-8'))
 
                 print(f"   [UPDATE] Updated from {LISTENER_VERSION} to {new_version}")
                 print(f"   [UPDATE] Backup saved to {backup_path}")
@@ -226,8 +430,9 @@ class AgentListener:
 
             try:
                 failed_path = listener_path.with_suffix('.py.failed')
-                shutil.copy(listener_path, failed_path)
-                shutil.copy(backup_path, listener_path)
+                shutil.copyfile(listener_path, failed_path)
+
+                write_bytes_atomic(listener_path, backup_path.read_bytes())
 
                 print(f"   [ROLLBACK] Restored from backup")
                 return jsonify({
@@ -260,30 +465,28 @@ class AgentListener:
         @self.app.route('/context', methods=['GET'])
         def list_context():
             files = []
-            claude_md = WORKING_DIR / "CLAUDE.md"
-            claude_content = claude_md.read_text(encoding='utf-8') if claude_md.exists() else ""
+            included = self.claude_md.included()
 
-            for f in CONTEXT_DIR.glob("*.md"):
-                stat = f.stat()
+            for entry in scan_files(CONTEXT_DIR, ".md"):
+                stat = entry.stat()
                 files.append({
-                    "name": f.stem,
-                    "filename": f.name,
+                    "name": entry.name[:-len(".md")],
+                    "filename": entry.name,
                     "size_bytes": stat.st_size,
                     "modified": datetime.fromtimestamp(stat.st_mtime).isoformat(),
-                    "included": f"@context/{f.name}" in claude_content
+                    "included": entry.name in included
                 })
             return jsonify({"context_files": files, "total": len(files)})
 
         @self.app.route('/context', methods=['POST'])
         def create_context():
-            import re
             data = request.json
             name = data.get('name', '').strip()
             content = data.get('content', '')
 
             if not name:
                 return jsonify({"error": "Name required"}), 400
-            if not re.match(r'^[A-Za-z0-9_-]+$', name):
+            if not NAME_RE.match(name):
                 return jsonify({"error": "Invalid name (alphanumeric, dash, underscore only)"}), 400
 
             filepath = CONTEXT_DIR / f"{name}.md"
@@ -296,21 +499,23 @@ class AgentListener:
 
         @self.app.route('/context/<name>', methods=['GET'])
         def get_context(name):
-            import re
-            if not re.match(r'^[A-Za-z0-9_-]+$', name):
+            if not NAME_RE.match(name):
                 return jsonify({"error": "Invalid name"}), 400
 
             filepath = CONTEXT_DIR / f"{name}.md"
-            if not filepath.exists():
+            try:
+                etag = file_etag(filepath)
+            except FileNotFoundError:
                 return jsonify({"error": f"Context '{name}' not found"}), 404
+            if request.headers.get('If-None-Match') == etag:
+                return '', 304, {"ETag": etag}
 
             content = filepath.read_text(encoding='utf-8')
-            return jsonify({"name": name, "content": content})
+            return jsonify({"name": name, "content": content}), 200, {"ETag": etag}
 
         @self.app.route('/context/<name>', methods=['PUT'])
         def save_context(name):
-            import re
-            if not re.match(r'^[A-Za-z0-9_-]+$', name):
+            if not NAME_RE.match(name):
                 return jsonify({"error": "Invalid name"}), 400
 
             data = request.json
@@ -326,8 +531,7 @@ class AgentListener:
 
         @self.app.route('/context/<name>', methods=['DELETE'])
         def delete_context(name):
-            import re
-            if not re.match(r'^[A-Za-z0-9_-]+$', name):
+            if not NAME_RE.match(name):
                 return jsonify({"error": "Invalid name"}), 400
 
             filepath = CONTEXT_DIR / f"{name}.md"
@@ -341,10 +545,15 @@ class AgentListener:
         @self.app.route('/claude-md', methods=['GET'])
         def get_claude_md():
             claude_md = WORKING_DIR / "CLAUDE.md"
-            if not claude_md.exists():
+            try:
+                etag = file_etag(claude_md)
+            except FileNotFoundError:
                 return jsonify({"error": "CLAUDE.md not found"}), 404
+            if request.headers.get('If-None-Match') == etag:
+                return '', 304, {"ETag": etag}
+
             content = claude_md.read_text(encoding='utf-8')
-            return jsonify({"content": content})
+            return jsonify({"content": content}), 200, {"ETag": etag}
 
         @self.app.route('/claude-md', methods=['PUT'])
         def save_claude_md():
@@ -355,6 +564,7 @@ class AgentListener:
 
             claude_md = WORKING_DIR / "CLAUDE.md"
             claude_md.write_text(content, encoding='utf-8')
+            self.claude_md.invalidate()
             print(f"   [CLAUDE.md] Updated ({len(content)} chars)")
             return jsonify({"status": "saved"})
 
@@ -363,9 +573,8 @@ class AgentListener:
         @self.app.route('/skills/available', methods=['GET'])
         def list_available_skills():
             try:
-                response = requests.get(
+                response = CRM_SESSION.get(
                     f"{CRM_ENDPOINT}/api/skills",
-                    headers={"X-API-Key": CRM_API_KEY},
                     timeout=10
                 )
                 if response.status_code == 200:
@@ -377,13 +586,12 @@ class AgentListener:
 
         @self.app.route('/skills/publish', methods=['POST'])
         def publish_skill():
-            import re
             data = request.json
             name = data.get('name', '').strip()
 
             if not name:
                 return jsonify({"error": "Skill name required"}), 400
-            if not re.match(r'^[A-Za-z0-9_-]+$', name):
+            if not NAME_RE.match(name):
                 return jsonify({"error": "Invalid name"}), 400
 
             filepath = CONTEXT_DIR / f"{name}.md"
@@ -393,9 +601,8 @@ class AgentListener:
             content = filepath.read_text(encoding='utf-8')
 
             try:
-                response = requests.post(
+                response = CRM_SESSION.post(
                     f"{CRM_ENDPOINT}/api/skills",
-                    headers={"X-API-Key": CRM_API_KEY, "Content-Type": "application/json"},
                     json={"name": name, "content": content, "source_agent": AGENT_NAME},
                     timeout=10
                 )
@@ -409,14 +616,13 @@ class AgentListener:
 
         @self.app.route('/skills/pull', methods=['POST'])
         def pull_skill():
-            import re
             data = request.json
             name = data.get('name', '').strip()
             overwrite = data.get('overwrite', False)
 
             if not name:
                 return jsonify({"error": "Skill name required"}), 400
-            if not re.match(r'^[A-Za-z0-9_-]+$', name):
+            if not NAME_RE.match(name):
                 return jsonify({"error": "Invalid name"}), 400
 
             filepath = CONTEXT_DIR / f"{name}.md"
@@ -424,9 +630,8 @@ class AgentListener:
                 return jsonify({"error": f"Local context '{name}' already exists. Set overwrite=true."}), 409
 
             try:
-                response = requests.get(
+                response = CRM_SESSION.get(
                     f"{CRM_ENDPOINT}/api/skills/{name}",
-                    headers={"X-API-Key": CRM_API_KEY},
                     timeout=10
                 )
                 if response.status_code == 200:
@@ -445,48 +650,53 @@ class AgentListener:
         @self.app.route('/skills/sync', methods=['POST'])
         def sync_skills():
             results = {"published": [], "failed": []}
-
-            for filepath in CONTEXT_DIR.glob("*.md"):
-                name = filepath.stem
-                if name in ('state', 'history'):
-                    continue
-
-                content = filepath.read_text(encoding='utf-8')
-                try:
-                    response = requests.post(
-                        f"{CRM_ENDPOINT}/api/skills",
-                        headers={"X-API-Key": CRM_API_KEY, "Content-Type": "application/json"},
-                        json={"name": name, "content": content, "source_agent": AGENT_NAME},
-                        timeout=10
-                    )
-                    if response.status_code in (200, 201):
-                        results["published"].append(name)
-                    else:
-                        results["failed"].append({"name": name, "error": response.status_code})
-                except Exception as e:
-                    results["failed"].append({"name": name, "error": str(e)})
+            skill_files = [
+                filepath for filepath in CONTEXT_DIR.glob("*.md")
+                if filepath.stem not in ('state', 'history')
+            ]
+
+            # Publish concurrently over the pooled session; map keeps glob order
+            with ThreadPoolExecutor(max_workers=SKILL_SYNC_WORKERS) as executor:
+                outcomes = list(executor.map(self._publish_skill_file, skill_files))
+
+            for name, error in outcomes:
+                if error is None:
+                    results["published"].append(name)
+                else:
+                    results["failed"].append({"name": name, "error": error})
 
             print(f"   [SKILLS] Sync complete: {len(results['published'])} published, {len(results['failed'])} failed")
             return jsonify(results)
 
     # ============ HANDLERS ============
 
-    def _handle_get_threads(self):
-        threads_info = []
+    def _publish_skill_file(self, filepath: Path):
+        """Publish one context file as a skill. Returns (name, error or None)."""
+        name = filepath.stem
+        try:
+            content = filepath.read_text(encoding='utf-8')
+            response = CRM_SESSION.post(
+                f"{CRM_ENDPOINT}/api/skills",
+                json={"name": name, "content": content, "source_agent": AGENT_NAME},
+                timeout=10
+            )
+            if response.status_code in (200, 201):
+                return name, None
+            return name, response.status_code
+        except Exception as e:
+            return name, str(e)
 
-        for thread_file in THREADS_DIR.glob("*.json"):
-            thread_id = thread_file.stem
-            try:
-                history = self._load_history(thread_id)
-                if history:
-                    threads_info.append({
-                        "thread_id": thread_id,
-                        "status": self.threads.get(thread_id, ThreadState(thread_id)).status,
-                        "message_count": len([m for m in history if m.get("role") == "user"]),
-                        "last_active": history[-1].get("timestamp", "")
-                    })
-            except Exception as e:
-                print(f"WARNING: Error loading thread {thread_id}: {e}")
+    def _handle_get_threads(self):
+        with self._history_lock:
+            threads_info = [
+                {
+                    "thread_id": thread_id,
+                    "status": self.threads.get(thread_id, ThreadState(thread_id)).status,
+                    "message_count": meta.user_count,
+                    "last_active": meta.last_active
+                }
+                for thread_id, meta in sorted(self._thread_meta.items())
+            ]
 
         return jsonify({"threads": threads_info})
 
@@ -499,10 +709,15 @@ class AgentListener:
         if deleted_memory:
             del self.threads[thread_id]
 
-        history_file = THREADS_DIR / f"{thread_id}.json"
-        deleted_disk = history_file.exists()
-        if deleted_disk:
-            history_file.unlink()
+        with self._history_lock:
+            self._history_cache.pop(thread_id, None)
+            self._thread_meta.pop(thread_id, None)
+
+        deleted_disk = False
+        for history_file in (self._history_path(thread_id), self._legacy_history_path(thread_id)):
+            if history_file.exists():
+                history_file.unlink()
+                deleted_disk = True
 
         if not deleted_memory and not deleted_disk:
             return jsonify({"error": f"Thread '{thread_id}' not found"}), 404
@@ -512,11 +727,17 @@ class AgentListener:
 
     def _handle_send_message(self):
         try:
-            data = request.json
-            thread_id = data.get('thread_id', 'general')
-            message = data.get('message')
-            sender = data.get('sender', 'unknown')
-            channel = data.get('channel', 'unknown')
+            # Parsed once (and cached) by the app's JSON provider - orjson when installed
+            data = request.get_json(silent=True)
+            if not isinstance(data, dict):
+                return jsonify({"error": "JSON object body required"}), 400
+
+            thread_id, message, sender, channel = (
+                data.get('thread_id', 'general'),
+                data.get('message'),
+                data.get('sender', 'unknown'),
+                data.get('channel', 'unknown'),
+            )
 
             if not message:
                 return jsonify({"error": "Message required"}), 400
@@ -524,8 +745,14 @@ class AgentListener:
             print(f"\n>> [{AGENT_NAME}] Received message for thread '{thread_id}' from {sender} via {channel}")
             print(f"   Message: {message[:100]}...")
 
+            with self._pending_lock:
+                if self._pending_messages >= MAX_PENDING_MESSAGES:
+                    print(f"   [BUSY] {self._pending_messages} messages pending - rejecting")
+                    return jsonify({"error": "Too many messages in progress, retry later"}), 429
+                self._pending_messages += 1
+
             threading.Thread(
-                target=self._process_message_sync,
+                target=self._run_message,
                 args=(thread_id, message, sender, channel),
                 daemon=True
             ).start()
@@ -542,21 +769,33 @@ class AgentListener:
             traceback.print_exc()
             return jsonify({"error": str(e)}), 500
 
+    def _run_message(self, thread_id: str, message: str, sender: str, channel: str):
+        try:
+            with self._session_slots:
+                self._process_message_sync(thread_id, message, sender, channel)
+        finally:
+            with self._pending_lock:
+                self._pending_messages -= 1
+
     def _process_message_sync(self, thread_id: str, message: str, sender: str, channel: str):
         try:
             if thread_id not in self.threads:
                 self.threads[thread_id] = ThreadState(thread_id, "live")
+            # One clock read when the message arrives and one when the reply is ready
+            received = datetime.now()
+            received_iso = received.isoformat()
             self.threads[thread_id].status = "live"
-            self.threads[thread_id].last_active = datetime.now()
+            self.threads[thread_id].last_active = received
 
-            self._save_message(thread_id, "user", message)
-            self._write_dynamic_context(thread_id, sender, channel)
+            self._save_message(thread_id, "user", message, received_iso)
+            self._write_dynamic_context(thread_id, sender, channel, received_iso)
 
             print(f"   [CLAUDE] Spawning Claude CLI for thread '{thread_id}'...")
             response_text = self._run_claude_cli(message)
 
-            self._save_message(thread_id, "assistant", response_text)
-            self._send_to_crm(thread_id, sender, channel, response_text)
+            replied_iso = datetime.now().isoformat()
+            self._save_message(thread_id, "assistant", response_text, replied_iso)
+            self._send_to_crm(thread_id, sender, channel, response_text, replied_iso)
 
             self.threads[thread_id].status = "sleeping"
             self.threads[thread_id].message_count += 1
@@ -570,13 +809,16 @@ class AgentListener:
             if thread_id in self.threads:
                 self.threads[thread_id].status = "sleeping"
 
-    def _write_dynamic_context(self, thread_id: str, sender: str, channel: str):
+    def _write_dynamic_context(self, thread_id: str, sender: str, channel: str,
+                               timestamp: Optional[str] = None):
+        timestamp = timestamp or datetime.now().isoformat()
+
         # Write state.md
         state_content = f"""# Current State
 
 ## Session Info
 - Thread: {thread_id}
-- Timestamp: {datetime.now().isoformat()}
+- Timestamp: {timestamp}
 - Channel: {channel}
 - Sender: {sender}
 
@@ -584,29 +826,31 @@ class AgentListener:
 - Agent: {AGENT_NAME}
 - Working Directory: {WORKING_DIR}
 """
-        (CONTEXT_DIR / "state.md").write_text(state_content, encoding='utf-8')
+        self._write_context_file("state.md", state_content)
 
         # Write history.md
         history = self._load_history(thread_id)
         if history:
-            history_lines = ["# Conversation History\n"]
-            history_lines.append(f"Thread: {thread_id}\n")
-            history_lines.append(f"Total messages: {len(history)}\n\n")
-
-            for msg in history:
-                role = "User" if msg["role"] == "user" else AGENT_NAME
-                timestamp = msg.get("timestamp", "")
-                content = msg["content"]
-                history_lines.append(f"**{role}** ({timestamp}):\n{content}\n\n---\n")
-
-            history_content = "\n".join(history_lines)
+            header = f"# Conversation History\n\nThread: {thread_id}\nTotal messages: {len(history)}\n\n"
+            # One f-string per message, joined once
+            body = "".join(
+                f"**{'User' if msg['role'] == 'user' else AGENT_NAME}** ({msg.get('timestamp', '')}):\n"
+                f"{msg['content']}\n\n---\n\n"
+                for msg in history
+            )
+            history_content = header + body
         else:
             history_content = "# Conversation History\n\n(No prior history - this is a new conversation)"
 
-        (CONTEXT_DIR / "history.md").write_text(history_content, encoding='utf-8')
+        self._write_context_file("history.md", history_content)
 
         print(f"   [CONTEXT] Dynamic context written (state + {len(history)} history messages)")
 
+    def _write_context_file(self, filename: str, content: str):
+        """Atomically replace a dynamic context file."""
+        # Write-then-rename so Claude never reads a half-written file
+        write_bytes_atomic(CONTEXT_DIR / filename, content.encode('utf-8'))
+
     def _run_claude_cli(self, message: str) -> str:
         cmd = [
             "claude",
@@ -620,31 +864,36 @@ class AgentListener:
 
         print(f"   [CLI] Running: claude -p '<message>' in {WORKING_DIR}")
 
+        # On POSIX a list with shell=True runs only cmd[0], dropping every argument.
+        # Windows still needs the shell to resolve npm's claude.cmd shim.
         result = subprocess.run(
             cmd,
             cwd=str(WORKING_DIR),
             env=env,
             capture_output=True,
-            text=True,
-            shell=True,
+            shell=(os.name == "nt"),
             timeout=300
         )
 
+        # Raw bytes, decoded once as UTF-8 (text=True would use the locale codec)
         if result.returncode != 0:
-            error_msg = result.stderr or "Unknown error"
+            error_msg = result.stderr.decode('utf-8', errors='replace') or "Unknown error"
             print(f"   [CLI] Error: {error_msg[:200]}")
             raise Exception(f"Claude CLI error: {error_msg}")
 
-        print(f"   [CLI] Success - response length: {len(result.stdout)} chars")
-        return result.stdout.strip()
+        output = result.stdout.decode('utf-8', errors='replace')
+        print(f"   [CLI] Success - response length: {len(output)} chars")
+        return output.strip()
 
-    def _send_to_crm(self, thread_id: str, sender: str, channel: str, response_text: str):
+    def _send_to_crm(self, thread_id: str, sender: str, channel: str, response_text: str,
+                     timestamp: Optional[str] = None):
+        timestamp = timestamp or datetime.now().isoformat()
         try:
             payload = {
                 "thread_id": thread_id,
                 "sender": sender,
                 "channel": channel,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "agent": AGENT_NAME,
                 "message": {
                     "type": "assistant",
@@ -652,10 +901,9 @@ class AgentListener:
                 }
             }
 
-            response = requests.post(
+            response = CRM_SESSION.post(
                 f"{CRM_ENDPOINT}/api/agent/stream",
                 json=payload,
-                headers={"X-API-Key": CRM_API_KEY},
                 timeout=5
             )
 
@@ -667,7 +915,7 @@ class AgentListener:
                 "thread_id": thread_id,
                 "sender": sender,
                 "channel": channel,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": timestamp,
                 "agent": AGENT_NAME,
                 "message": {
                     "type": "result",
@@ -677,10 +925,9 @@ class AgentListener:
                 }
             }
 
-            requests.post(
+            CRM_SESSION.post(
                 f"{CRM_ENDPOINT}/api/agent/stream",
                 json=result_payload,
-                headers={"X-API-Key": CRM_API_KEY},
                 timeout=5
             )
 
@@ -689,7 +936,7 @@ class AgentListener:
 
     def _send_error_to_crm(self, thread_id: str, sender: str, channel: str, error: str):
         try:
-            requests.post(
+            CRM_SESSION.post(
                 f"{CRM_ENDPOINT}/api/agent/error",
                 json={
                     "thread_id": thread_id,
@@ -699,38 +946,150 @@ class AgentListener:
                     "agent": AGENT_NAME,
                     "error": error
                 },
-                headers={"X-API-Key": CRM_API_KEY},
                 timeout=5
             )
         except Exception as e:
             print(f"   WARNING: Failed to send error to CRM: {e}")
 
+    def _build_thread_index(self) -> Dict[str, ThreadMeta]:
+        """One startup pass over threads/ - counts lines instead of parsing every message."""
+        index = {}
+
+        # Legacy files are migrated here only, keeping loads and saves free of the check
+        for entry in scan_files(THREADS_DIR, ".json"):
+            self._migrate_legacy_history(os.path.splitext(entry.name)[0])
+
+        for entry in scan_files(THREADS_DIR, ".jsonl"):
+            thread_id = entry.name[:-len(".jsonl")]
+            try:
+                meta = ThreadMeta()
+                last_line = None
+                with open(entry.path, 'rb') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        # Both json and orjson spellings; quotes inside content are escaped
+                        if b'"role":"user"' in line or b'"role": "user"' in line:
+                            meta.user_count += 1
+                        last_line = line
+                if last_line is None:
+                    continue
+                try:
+                    meta.last_active = loads_line(last_line).get("timestamp", "")
+                except ValueError:
+                    pass
+                index[thread_id] = meta
+            except Exception as e:
+                print(f"WARNING: Error indexing thread {thread_id}: {e}")
+
+        return index
+
+    def _history_path(self, thread_id: str) -> Path:
+        return THREADS_DIR / f"{thread_id}.jsonl"
+
+    def _legacy_history_path(self, thread_id: str) -> Path:
+        return THREADS_DIR / f"{thread_id}.json"
+
+    def _migrate_legacy_history(self, thread_id: str):
+        """Convert a pre-1.2 JSON array history file to JSONL, once.
+
+        If a JSONL history already exists (e.g. a 1.1 listener ran after a
+        rollback), the legacy entries are appended to it rather than replacing it.
+        """
+        legacy_file = self._legacy_history_path(thread_id)
+        if not legacy_file.exists():
+            return
+
+        history_file = self._history_path(thread_id)
+        try:
+            with open(legacy_file, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+            data = b''.join(dumps_line(entry) for entry in history)
+            with self._history_lock:
+                if history_file.exists():
+                    with open(history_file, 'ab+') as f:
+                        # Terminate a torn last line so it doesn't swallow the first entry
+                        if f.seek(0, os.SEEK_END) > 0:
+                            f.seek(-1, os.SEEK_END)
+                            if f.read(1) != b'\n':
+                                data = b'\n' + data
+                        f.write(data)
+                else:
+                    write_bytes_atomic(history_file, data)
+                legacy_file.unlink()
+            print(f"   [HISTORY] Migrated thread '{thread_id}' to JSONL ({len(history)} messages)")
+        except Exception as e:
+            print(f"   WARNING: Failed to migrate history: {e}")
+
     def _load_history(self, thread_id: str) -> List[dict]:
-        history_file = THREADS_DIR / f"{thread_id}.json"
+        with self._history_lock:
+            history = self._history_cache.get(thread_id)
+            if history is None:
+                history = self._read_history_file(thread_id)
+                if history is None:
+                    return []
+                self._history_cache[thread_id] = history
+                if len(self._history_cache) > HISTORY_CACHE_SIZE:
+                    self._history_cache.popitem(last=False)
+            else:
+                self._history_cache.move_to_end(thread_id)
+            # Callers get their own list; the cached one only grows via _save_message
+            return list(history)
+
+    def _read_history_file(self, thread_id: str) -> Optional[List[dict]]:
+        """Read a thread's JSONL history; None if the file could not be read."""
+        history_file = self._history_path(thread_id)
         if history_file.exists():
             try:
-                with open(history_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                history = []
+                with open(history_file, 'rb') as f:
+                    for line in f:
+                        if not line.strip():
+                            continue
+                        try:
+                            history.append(loads_line(line))
+                        except ValueError:
+                            # A crash mid-append can leave one torn line behind
+                            print(f"   WARNING: Skipping unreadable history line in {history_file.name}")
+                return history
             except Exception as e:
                 print(f"   WARNING: Failed to load history: {e}")
-                return []
+                return None
         return []
 
-    def _save_message(self, thread_id: str, role: str, content: str):
-        history_file = THREADS_DIR / f"{thread_id}.json"
-        history = self._load_history(thread_id)
-
-        history.append({
+    def _save_message(self, thread_id: str, role: str, content: str,
+                      timestamp: Optional[str] = None):
+        entry = {
             "role": role,
             "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
+            "timestamp": timestamp or datetime.now().isoformat()
+        }
 
-        try:
-            with open(history_file, 'w', encoding='utf-8') as f:
-                json.dump(history, f, indent=2, ensure_ascii=False)
-        except Exception as e:
-            print(f"   WARNING: Failed to save history: {e}")
+        # Append-only: one JSON object per line, no rewrite of earlier messages
+        line = dumps_line(entry)
+        with self._history_lock:
+            try:
+                with open(self._history_path(thread_id), 'ab+') as f:
+                    # Terminate a torn last line so it doesn't swallow this entry
+                    if f.seek(0, os.SEEK_END) > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b'\n':
+                            line = b'\n' + line
+                    f.write(line)
+            except Exception as e:
+                print(f"   WARNING: Failed to save history: {e}")
+                # Drop the cached copy so the next load reflects what's on disk
+                self._history_cache.pop(thread_id, None)
+                return
+
+            cached = self._history_cache.get(thread_id)
+            if cached is not None:
+                cached.append(entry)
+
+            meta = self._thread_meta.setdefault(thread_id, ThreadMeta())
+            if role == "user":
+                meta.user_count += 1
+            meta.last_active = entry["timestamp"]
 
     def run(self):
         print(f"""
@@ -746,13 +1105,11 @@ class AgentListener:
         """)
 
         # Show CLAUDE.md info
-        claude_md = WORKING_DIR / "CLAUDE.md"
-        if claude_md.exists():
-            content = claude_md.read_text(encoding='utf-8')
-            imports = [line.strip() for line in content.split('\n') if line.strip().startswith('@context/')]
+        if self.claude_md.path.exists():
+            imports = self.claude_md.imports()
             print(f"CLAUDE.md imports: {len(imports)}")
             for imp in imports:
-                print(f"  - {imp}")
+                print(f"  - @context/{imp}")
         else:
             print("WARNING: CLAUDE.md not found in agent/")
 
@@ -760,20 +1117,34 @@ class AgentListener:
         for f in CONTEXT_DIR.glob("*.md"):
             print(f"  - {f.name}")
 
-        # Register with CRM (retries if Tailscale not ready yet)
-        print(f"\nRegistering with CRM...")
-        register_with_crm()
+        # Register with CRM in the background so serving isn't held up by retries
+        print(f"\nRegistering with CRM in background...")
+        threading.Thread(target=register_with_crm, name="crm-register", daemon=True).start()
 
         print(f"\nReady to receive messages.\n")
 
-        self.app.run(
-            host=LISTEN_HOST,
-            port=LISTEN_PORT,
-            debug=False,
-            threaded=True
-        )
+        if waitress_serve is not None:
+            print(f"Serving with waitress ({SERVER_THREADS} threads)")
+            waitress_serve(
+                self.app,
+                host=LISTEN_HOST,
+                port=LISTEN_PORT,
+                threads=SERVER_THREADS
+            )
+        else:
+            print("WARNING: waitress not installed - using Flask dev server")
+            self.app.run(
+                host=LISTEN_HOST,
+                port=LISTEN_PORT,
+                debug=False,
+                threaded=True
+            )
 
 
-if __name__ == "__main__":
+def main():
     listener = AgentListener()
     listener.run()
+
+
+if __name__ == "__main__":
+    main()